@@ -23,7 +23,6 @@ effect.
 import os
 import re
 import shlex
-import shutil
 import subprocess
 import sys
 import tempfile
@@ -31,6 +30,7 @@ import tempfile
 PACKAGE_NAME = b"ncurses"
 NCURSES_VERSION_PREFIX = b"ncurses "
 NCURSES_STOCK_EXPECTED_VERSION = NCURSES_VERSION_PREFIX + b"5.7.20081102"
+NCURSES_STOCK_VERSION_KEY = (5, 7, 20081102)
 
 INFOCMP_FALLBACK = b"infocmp"
 INFOCMP_SUFFIX = b"/bin/infocmp"
@@ -39,6 +39,9 @@ STOCK_TIC = b"/usr/bin/tic"
 
 TERMINFO_NAME = b"tmux-256color"
 
+BREW_ENV = {k: v for k, v in os.environb.items() if k != b"HOMEBREW_COLOR"}
+BREW_ENV[b"HOMEBREW_NO_COLOR"] = b"1"
+
 
 def get_user_terminfo_dir():
     return os.path.expanduser(os.path.join("~", ".local", "share", "terminfo"))
@@ -50,40 +53,44 @@ def package_files_macports(package_name: bytes):
     expected_header = b"Port " + package_name + b" contains:"
 
     try:
-        report = subprocess.run(
+        proc = subprocess.Popen(
             [b"port", b"contents", package_name],
             stdin=subprocess.DEVNULL,
             stdout=subprocess.PIPE,
-            check=True,
         )
     except (subprocess.SubprocessError, OSError):
         return
 
-    lines = report.stdout.splitlines(keepends=False)
-    if len(lines) > 1:
-        if lines.pop(0) == expected_header:
-            for line in lines:
+    files = []
+    with proc:
+        if next(proc.stdout, b"").rstrip(b"\n") == expected_header:
+            for line in proc.stdout:
                 if line.startswith(b"  "):
-                    yield line[2:]
+                    files.append(line[2:].rstrip(b"\n"))
+
+    # Only trust the listing if port exited cleanly
+    if proc.returncode == 0:
+        yield from files
 
 
 def package_files_homebrew(package_name: bytes):
-    brew_env = dict(os.environb)
-    brew_env.pop(b"HOMEBREW_COLOR", None)
-    brew_env[b"HOMEBREW_NO_COLOR"] = b"1"
     try:
-        report = subprocess.run(
+        proc = subprocess.Popen(
             [b"brew", b"ls", b"--verbose", package_name],
-            env=brew_env,
+            env=BREW_ENV,
             stdin=subprocess.DEVNULL,
             stdout=subprocess.PIPE,
             stderr=subprocess.DEVNULL,
-            check=True,
         )
     except (subprocess.SubprocessError, OSError):
         return
 
-    yield from report.stdout.splitlines(keepends=False)
+    with proc:
+        files = [line.rstrip(b"\n") for line in proc.stdout]
+
+    # Only trust the listing if brew exited cleanly
+    if proc.returncode == 0:
+        yield from files
 
 
 def find_infocmp():
@@ -99,6 +106,9 @@ def find_infocmp():
 
     if len(candidates) == 0:
         candidates.append(INFOCMP_FALLBACK)
+    else:
+        # Both package managers may report the same executable
+        candidates = list(dict.fromkeys(candidates))
 
     best_exe = None
     best_version = None
@@ -115,13 +125,15 @@ def find_infocmp():
             if version_str.startswith(NCURSES_VERSION_PREFIX):
                 version_n = version_str[len(NCURSES_VERSION_PREFIX) :]
                 print(f"found {exe!r} {version_n!r}")
-                version_key = tuple(
-                    int(n) for n in version_n.decode("ascii").split(".")
-                )
+                version_key = tuple(int(n) for n in version_n.split(b"."))
                 if best_version_key is None or version_key > best_version_key:
                     best_exe = exe
                     best_version = version_n
                     best_version_key = version_key
+                # Anything newer than stock will do, so don't spend more
+                # process launches looking for the newest
+                if version_key > NCURSES_STOCK_VERSION_KEY:
+                    break
         except (subprocess.SubprocessError, OSError):
             continue
 
@@ -132,32 +144,11 @@ def find_infocmp():
     return best_exe
 
 
-def clamp_terminfo_number(key_value: bytes):
-    key, h, int_str = key_value.partition(b"#")
-    if h != b"#":
-        return key_value
-
-    try:
-        if int_str.startswith(b"0x") or int_str.startswith(b"0X"):
-            int_value = int(int_str[2:], 16)
-        elif int_str.startswith(b"0"):
-            int_value = int(int_str, 8)
-        else:
-            int_value = int(int_str, 10)
-    except ValueError:
-        return key_value
-
-    if int_value > 32767:
-        return key + b"#32767"
-
-    return key_value
-
-
 TERMINFO_INTEGER_PATTERN = re.compile(
     rb"""
         \b
         pairs\#
-        (?:
+        (
             0[Xx][0-9A-Fa-f]+
             | 0[0-7]+
             | [1-9][0-9]*
@@ -167,26 +158,44 @@ TERMINFO_INTEGER_PATTERN = re.compile(
 )
 
 
+def clamp_terminfo_number(match: re.Match):
+    int_str = match[1]
+    if int_str.startswith(b"0x") or int_str.startswith(b"0X"):
+        int_value = int(int_str[2:], 16)
+    elif int_str.startswith(b"0"):
+        int_value = int(int_str, 8)
+    else:
+        int_value = int(int_str, 10)
+
+    if int_value > 32767:
+        return b"pairs#32767"
+
+    return match[0]
+
+
 def patch_shorts(terminfo_src: bytes):
-    return TERMINFO_INTEGER_PATTERN.sub(
-        lambda m: clamp_terminfo_number(m[0]), terminfo_src
-    )
+    return TERMINFO_INTEGER_PATTERN.sub(clamp_terminfo_number, terminfo_src)
 
 
 def dir_in_path(dir_, path_list):
     if path_list is None:
         return False
     if isinstance(path_list, str):
-        paths = path_list.split(os.pathsep)
+        sep = os.pathsep
         if isinstance(dir_, bytes):
             dir_ = os.fsdecode(dir_)
     elif isinstance(path_list, bytes):
-        paths = path_list.split(os.fsencode(os.pathsep))
+        sep = os.fsencode(os.pathsep)
         if isinstance(dir_, str):
             dir_ = os.fsencode(dir_)
     else:
         raise TypeError("path_list must be str or bytes")
-    return dir_ in paths
+    # A single entry can't contain the separator
+    if sep in dir_:
+        return False
+    # Bordering both sides with the separator makes this match whole
+    # entries only, without splitting path_list into a list
+    return (sep + dir_ + sep) in (sep + path_list + sep)
 
 
 def main():
@@ -225,8 +234,7 @@ def main():
     print(f"Output dir is {out_dir}")
     os.makedirs(out_dir, exist_ok=True)
 
-    tempdir = tempfile.mkdtemp()
-    try:
+    with tempfile.TemporaryDirectory() as tempdir:
         src_file = os.path.join(tempdir, os.fsdecode(TERMINFO_NAME + b".src"))
         with open(src_file, "wb") as writer:
             writer.write(term_src)
@@ -236,8 +244,6 @@ def main():
             check=True,
             stdin=subprocess.DEVNULL,
         )
-    finally:
-        shutil.rmtree(tempdir)
 
     print("Complete")
 